@@ -0,0 +1 @@
+# Lets the tests under tests/ import the `core` package from the repo root.
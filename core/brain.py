@@ -1,24 +1,82 @@
 import base64
 import json
 import os
+import time
 import hashlib
+import threading
+import numpy as np
 import chromadb
+from chromadb.utils import embedding_functions
 from groq import Groq
 from duckduckgo_search import DDGS
+from core.scheduler import RateLimitScheduler, TurnCancelled
+from core.facts import FactExtractor
+from core.logger import get_logger
+
+logger = get_logger("brain")
 
 # --- MEMORY ENGINE ---
 class vegaMemory:
     def __init__(self):
         self.client = chromadb.PersistentClient(path="./vega_memory_db")
-        self.collection = self.client.get_or_create_collection(name="user_facts")
+        # One embedder for both Chroma's own embedding and remember_many's dedupe
+        self.embedder = embedding_functions.DefaultEmbeddingFunction()
+        self.collection = self.client.get_or_create_collection(
+            name="user_facts", embedding_function=self.embedder
+        )
 
     def _generate_id(self, text):
         return hashlib.sha256(text.encode()).hexdigest()
 
     def remember(self, text):
-        print(f">>> MEMORIZING: {text}")
+        logger.info("MEMORIZING: %s", text)
         self.collection.add(documents=[text], ids=[self._generate_id(text)])
 
+    def remember_many(self, facts, similarity=0.92):
+        """
+        Stores a batch of facts in one upsert. Anything whose embedding is
+        closer than `similarity` (cosine) to a stored fact or to an earlier
+        fact in the same batch is dropped.
+        """
+        facts = list(dict.fromkeys(facts))
+        if not facts:
+            return []
+        vectors = np.array(self.embedder(facts), dtype=np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-9
+
+        # One query for the whole batch: nearest stored fact for each
+        nearest = [None] * len(facts)
+        if self.collection.count():
+            results = self.collection.query(
+                query_embeddings=vectors.tolist(), n_results=1, include=["embeddings"]
+            )
+            for i, found in enumerate(results["embeddings"]):
+                if found is not None and len(found):
+                    nearest[i] = np.asarray(found[0], dtype=np.float32)
+
+        keep = []
+        for i, vec in enumerate(vectors):
+            if nearest[i] is not None:
+                stored = nearest[i] / (np.linalg.norm(nearest[i]) + 1e-9)
+                if float(vec @ stored) >= similarity:
+                    continue
+            if any(float(vec @ vectors[j]) >= similarity for j in keep):
+                continue
+            keep.append(i)
+
+        if not keep:
+            return []
+        new_facts = [facts[i] for i in keep]
+        now = time.time()
+        self.collection.upsert(
+            ids=[self._generate_id(f) for f in new_facts],
+            documents=new_facts,
+            embeddings=[vectors[i].tolist() for i in keep],
+            metadatas=[{"source": "auto", "created": now} for _ in keep],
+        )
+        logger.info("MEMORIZED %d new facts (%d duplicates skipped)", len(keep), len(facts) - len(keep))
+        return new_facts
+
     def recall(self, query):
         try:
             results = self.collection.query(query_texts=[query], n_results=2)
@@ -30,7 +88,9 @@ class vegaMemory:
 # --- THE BRAIN ---
 class MagicBrain:
     def __init__(self, api_key):
-        self.client = Groq(api_key=api_key)
+        # Retries are handled by the scheduler so they respect the rate limits
+        self.client = Groq(api_key=api_key, max_retries=0)
+        self.scheduler = RateLimitScheduler()
         
         # Default Models
         self.text_model = "llama-3.1-8b-instant"
@@ -61,14 +121,22 @@ class MagicBrain:
         }
         self.load_short_term_memory()
 
+        # Set while no live turn is running; background jobs wait on it.
+        # Anything interactive (STT, thinking, speech) holds it via begin_live/end_live.
+        self.idle = threading.Event()
+        self.idle.set()
+        self.live_count = 0
+        self.live_lock = threading.Lock()
+        self.fact_extractor = FactExtractor(self, seen_file="core/facts_seen.json")
+
     # --- NEW: LIVE MODEL SWITCHING ---
     def set_models(self, text_model=None, vision_model=None):
         if text_model:
             self.text_model = text_model
-            print(f">>> SWITCHED BRAIN TO: {self.text_model}")
+            logger.info("SWITCHED BRAIN TO: %s", self.text_model)
         if vision_model:
             self.vision_model = vision_model
-            print(f">>> SWITCHED EYES TO: {self.vision_model}")
+            logger.info("SWITCHED EYES TO: %s", self.vision_model)
 
     def load_short_term_memory(self):
         if os.path.exists(self.short_term_file):
@@ -85,18 +153,52 @@ class MagicBrain:
             json.dump(self.chat_history, f)
 
     def search_internet(self, query):
-        print(f">>> BROWSING INTERNET: {query}")
+        logger.info("BROWSING INTERNET: %s", query)
         try:
             results = DDGS().text(query, max_results=3)
             if results:
                 summary = " ".join([r['body'] for r in results])
                 return f"\n[SEARCH RESULT for '{query}': {summary[:1000]}]"
         except Exception as e:
-            print(f"Search failed: {e}")
+            logger.warning("Search failed: %s", e)
         return "\n[SEARCH FAILED]"
 
+    def estimate_tokens(self, messages, max_tokens):
+        """Rough token count (~4 chars per token) so the scheduler can budget TPM."""
+        chars = 0
+        images = 0
+        for msg in messages:
+            content = msg["content"]
+            if isinstance(content, str):
+                chars += len(content)
+            else:
+                for part in content:
+                    if part.get("type") == "text": chars += len(part["text"])
+                    else: images += 1
+        return chars // 4 + images * 1000 + max_tokens
+
+    # --- LIVE TURN TRACKING ---
+    def begin_live(self):
+        with self.live_lock:
+            self.live_count += 1
+            self.idle.clear()
+
+    def end_live(self):
+        with self.live_lock:
+            self.live_count = max(0, self.live_count - 1)
+            if not self.live_count:
+                self.idle.set()
+
     def think(self, text_input, image_path=None):
+        self.begin_live()
+        try:
+            return self._think(text_input, image_path)
+        finally:
+            self.end_live()
+
+    def _think(self, text_input, image_path=None):
         clean_text = text_input.lower()
+        turn = self.scheduler.new_turn()
         
         # DYNAMIC MODEL SELECTION
         active_model = self.vision_model if image_path else self.text_model
@@ -136,11 +238,17 @@ class MagicBrain:
         # 4. API CALL
         api_messages = self.chat_history + [user_msg]
         try:
-            completion = self.client.chat.completions.create(
-                model=active_model,
-                messages=api_messages,
-                temperature=0.6,
-                max_tokens=400
+            completion = self.scheduler.submit(
+                active_model,
+                lambda timeout: self.client.chat.completions.with_raw_response.create(
+                    model=active_model,
+                    messages=api_messages,
+                    temperature=0.6,
+                    max_tokens=400,
+                    timeout=timeout
+                ),
+                est_tokens=self.estimate_tokens(api_messages, 400),
+                turn=turn
             )
             response_text = completion.choices[0].message.content
 
@@ -155,5 +263,9 @@ class MagicBrain:
 
             return response_text
 
+        except TurnCancelled:
+            # A newer turn took over, nothing to say for this one
+            return ""
         except Exception as e:
+            logger.error("Brain Error: %s", e)
             return f"Brain Error: {e}"
\ No newline at end of file
@@ -0,0 +1,153 @@
+import os
+import json
+import hashlib
+import threading
+from core.scheduler import SchedulerError
+from core.logger import get_logger
+
+logger = get_logger("facts")
+
+EXTRACT_PROMPT = (
+    "Extract durable facts about the user from the conversation below "
+    "(name, preferences, people, places, plans, habits). "
+    "Skip small talk, questions and anything only true right now. "
+    "Reply ONLY with a JSON list of short third-person sentences, or [] if there are none."
+)
+
+
+# --- BACKGROUND FACT EXTRACTION ---
+class FactExtractor:
+    """
+    Periodically reads new turns from the brain's chat history, asks the LLM for
+    lasting facts (one call per batch) and stores them in long-term memory.
+    Only works while the brain is idle and backs off as soon as a live turn starts.
+    """
+
+    def __init__(self, brain, interval=120, batch_size=6, similarity=0.92, seen_file="core/facts_seen.json"):
+        self.brain = brain
+        self.interval = interval
+        self.batch_size = batch_size
+        self.similarity = similarity
+        self.seen_file = seen_file
+        self.seen = self.load_seen()
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._loop, name="FactExtractor", daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def _loop(self):
+        while not self.stop_event.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception:
+                logger.exception("Fact extraction failed")
+
+    def _wait_idle(self):
+        """Blocks while a live turn is running. Returns False if we are shutting down."""
+        while not self.brain.idle.wait(timeout=1.0):
+            if self.stop_event.is_set():
+                return False
+        return not self.stop_event.is_set()
+
+    # --- PROCESSED TURNS (saved next to the chat history) ---
+    def load_seen(self):
+        if self.seen_file and os.path.exists(self.seen_file):
+            try:
+                with open(self.seen_file, "r") as f:
+                    return set(json.load(f))
+            except: pass
+        return set()
+
+    def save_seen(self):
+        """Keeps only keys still in the chat history, so the file stays as small as the history."""
+        if not self.seen_file:
+            return
+        current = {key for key, _, _ in self._turns()}
+        self.seen &= current
+        try:
+            with open(self.seen_file, "w") as f:
+                json.dump(sorted(self.seen), f)
+        except OSError as e:
+            logger.warning("Could not save processed turns: %s", e)
+
+    # --- BATCHING ---
+    def _turns(self):
+        """All user/assistant pairs in the chat history, keyed by content."""
+        history = list(self.brain.chat_history)
+        turns = []
+        for user, reply in zip(history, history[1:]):
+            if user.get("role") != "user" or reply.get("role") != "assistant":
+                continue
+            key = hashlib.sha256((user["content"] + reply["content"]).encode()).hexdigest()
+            turns.append((key, user["content"], reply["content"]))
+        return turns
+
+    def _pending_turns(self):
+        """Pairs we have not looked at yet."""
+        return [turn for turn in self._turns() if turn[0] not in self.seen]
+
+    def run_once(self):
+        turns = self._pending_turns()
+        while turns:
+            batch, turns = turns[:self.batch_size], turns[self.batch_size:]
+            if not self._wait_idle():
+                return
+            facts = self.extract(batch)
+            if facts is None:
+                # Pushed aside by a live turn, try again next round
+                return
+            if facts:
+                if not self._wait_idle():
+                    return
+                self.brain.long_term_memory.remember_many(facts, similarity=self.similarity)
+            self.seen.update(key for key, _, _ in batch)
+            self.save_seen()
+
+    def extract(self, batch):
+        """One LLM call for the whole batch. None means it was cancelled."""
+        transcript = "\n".join(f"USER: {user}\nVEGA: {reply}" for _, user, reply in batch)
+        messages = [
+            {"role": "system", "content": EXTRACT_PROMPT},
+            {"role": "user", "content": transcript},
+        ]
+        model = self.brain.text_model
+        scheduler = self.brain.scheduler
+        turn = scheduler.turn
+        if not self.brain.idle.is_set():
+            return None
+        try:
+            completion = scheduler.submit(
+                model,
+                lambda timeout: self.brain.client.chat.completions.with_raw_response.create(
+                    model=model,
+                    messages=messages,
+                    temperature=0,
+                    max_tokens=300,
+                    timeout=timeout
+                ),
+                est_tokens=self.brain.estimate_tokens(messages, 300),
+                deadline=60,
+                # Tied to the current turn so the next live turn cancels it
+                turn=turn
+            )
+        except SchedulerError as e:
+            logger.info("Fact extraction deferred: %s", e)
+            return None
+        return self.parse(completion.choices[0].message.content)
+
+    def parse(self, text):
+        start, end = text.find("["), text.rfind("]")
+        if start == -1 or end < start:
+            return []
+        try:
+            facts = json.loads(text[start:end + 1])
+        except ValueError:
+            logger.warning("Could not parse facts: %s", text)
+            return []
+        return [f.strip() for f in facts if isinstance(f, str) and f.strip()]
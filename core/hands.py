@@ -4,6 +4,9 @@ import webbrowser
 import subprocess
 import pyperclip
 import time
+from core.logger import get_logger
+
+logger = get_logger("hands")
 
 class vegaHands:
     def __init__(self):
@@ -18,6 +21,7 @@ class vegaHands:
             pyautogui.hotkey("ctrl", "v")
             return f"Typed: {text}"
         except Exception as e:
+            logger.warning("Typing failed: %s", e)
             return f"Typing failed: {e}"
 
     def execute_command(self, command_text):
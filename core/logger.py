@@ -0,0 +1,232 @@
+import os
+import json
+import time
+import queue
+import hashlib
+import atexit
+import logging
+import logging.handlers
+
+LOG_DIR = "logs"
+LOG_FILE = os.path.join(LOG_DIR, "vega.jsonl")
+SEEN_ERRORS_FILE = os.path.join(LOG_DIR, "seen_errors.json")
+MAX_SEEN_ERRORS = 200
+
+_queue_handler = None
+_listener = None
+_plain = logging.Formatter()
+
+
+# --- FORMATTERS ---
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, easy to grep and to load back."""
+
+    def format(self, record):
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(record.created))
+                  + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "msg": record.getMessage(),
+        }
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        if getattr(record, "repeat", 0):
+            entry["repeat"] = record.repeat
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class ConsoleFormatter(logging.Formatter):
+    def format(self, record):
+        text = f"[{record.levelname}] {record.name}: {record.getMessage()}"
+        if getattr(record, "repeat", 0):
+            text += f" (x{record.repeat})"
+        if record.exc_text:
+            text += "\n" + record.exc_text
+        return text
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Only renders the message and traceback on the caller's thread, the rest happens off-thread."""
+
+    def prepare(self, record):
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info and not record.exc_text:
+            record.exc_text = _plain.formatException(record.exc_info)
+        record.exc_info = None
+        return record
+
+
+# --- REPEAT COLLAPSING ---
+class CollapsingHandler(logging.Handler):
+    """
+    Wraps the real handlers and squashes repeats before they hit the disk:
+    - identical back-to-back records become one line plus "repeated N times"
+    - an error whose traceback was already written is logged again without it,
+      also across restarts (fingerprints are kept in `seen_path`)
+    """
+
+    def __init__(self, targets, seen_path=None, max_seen=MAX_SEEN_ERRORS):
+        super().__init__()
+        self.targets = targets
+        self.last = None
+        self.last_key = None
+        self.repeats = 0
+        self.seen_path = seen_path
+        self.max_seen = max_seen
+        self.seen_errors = self._load_seen()
+
+    def _key(self, record):
+        return (record.name, record.levelno, record.getMessage(), record.exc_text)
+
+    def _fingerprint(self, record):
+        text = f"{record.name}|{record.levelno}|{record.getMessage()}|{record.exc_text}"
+        return hashlib.sha256(text.encode("utf-8", "replace")).hexdigest()[:16]
+
+    # --- SEEN ERRORS (persisted) ---
+    def _load_seen(self):
+        """Oldest first, so the dict order doubles as the eviction order."""
+        if not self.seen_path or not os.path.exists(self.seen_path):
+            return {}
+        try:
+            with open(self.seen_path, "r", encoding="utf-8") as f:
+                return {fp: int(count) for fp, count in json.load(f)[-self.max_seen:]}
+        except (OSError, ValueError, TypeError):
+            return {}
+
+    def _save_seen(self):
+        if not self.seen_path:
+            return
+        tmp = self.seen_path + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(list(self.seen_errors.items()), f)
+            os.replace(tmp, self.seen_path)
+        except OSError:
+            pass
+
+    def _count_error(self, record):
+        fp = self._fingerprint(record)
+        count = self.seen_errors.pop(fp, 0) + 1
+        self.seen_errors[fp] = count  # re-insert as most recent
+        while len(self.seen_errors) > self.max_seen:
+            del self.seen_errors[next(iter(self.seen_errors))]
+        self._save_seen()
+        return count
+
+    def _write(self, record):
+        for target in self.targets:
+            if record.levelno >= target.level:
+                target.handle(record)
+
+    def _flush_repeats(self):
+        if self.repeats and self.last is not None:
+            summary = logging.makeLogRecord(self.last.__dict__)
+            summary.msg = f"last message repeated {self.repeats} times"
+            summary.args = None
+            summary.exc_info = None
+            summary.exc_text = None
+            summary.repeat = self.repeats
+            self._write(summary)
+        self.repeats = 0
+
+    def emit(self, record):
+        key = self._key(record)
+        if key == self.last_key:
+            self.repeats += 1
+            return
+        self._flush_repeats()
+        self.last, self.last_key = record, key
+
+        if record.exc_text and record.levelno >= logging.ERROR:
+            count = self._count_error(record)
+            if count > 1:
+                record = logging.makeLogRecord(record.__dict__)
+                record.exc_info = None
+                record.exc_text = None
+                record.repeat = count
+        self._write(record)
+
+    def flush(self):
+        self._flush_repeats()
+        for target in self.targets:
+            target.flush()
+
+    def close(self):
+        self.flush()
+        for target in self.targets:
+            target.close()
+        super().close()
+
+
+# --- SETUP ---
+def setup_logging(level=logging.INFO, max_bytes=2 * 1024 * 1024, backups=3, console=True):
+    """
+    Routes every logger through a queue; a background thread does the
+    formatting, collapsing, rotation and file I/O. Safe to call twice.
+    """
+    global _queue_handler, _listener
+    if _listener is not None:
+        return _queue_handler
+
+    os.makedirs(LOG_DIR, exist_ok=True)
+
+    file_handler = logging.handlers.RotatingFileHandler(
+        LOG_FILE, maxBytes=max_bytes, backupCount=backups, encoding="utf-8"
+    )
+    file_handler.setFormatter(JsonFormatter())
+    targets = [file_handler]
+
+    if console:
+        stream_handler = logging.StreamHandler()
+        stream_handler.setFormatter(ConsoleFormatter())
+        targets.append(stream_handler)
+
+    _queue_handler = _QueueHandler(queue.SimpleQueue())
+    _queue_handler.setLevel(level)
+    _listener = logging.handlers.QueueListener(
+        _queue_handler.queue, CollapsingHandler(targets, SEEN_ERRORS_FILE), respect_handler_level=False
+    )
+    _listener.start()
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(_queue_handler)
+    atexit.register(shutdown_logging)
+    return _queue_handler
+
+
+def capture(name, level=None):
+    """
+    Pulls a third-party logger into our queue and drops its own handlers.
+    Call it again after the library has set itself up, it may add a stderr handler on init.
+    """
+    target = logging.getLogger(name)
+    if _queue_handler is not None:
+        for handler in list(target.handlers):
+            if handler is not _queue_handler:
+                target.removeHandler(handler)
+        if _queue_handler not in target.handlers:
+            target.addHandler(_queue_handler)
+        target.propagate = False
+    if level is not None:
+        target.setLevel(level)
+    return target
+
+
+def shutdown_logging():
+    """Drains the queue and closes the files."""
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    _listener = None
+
+
+def get_logger(name):
+    return logging.getLogger(f"vega.{name}")
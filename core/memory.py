@@ -1,5 +1,8 @@
 import chromadb
 import hashlib
+from core.logger import get_logger
+
+logger = get_logger("memory")
 
 class vegaMemory:
     def __init__(self):
@@ -20,17 +23,17 @@ class vegaMemory:
         # Check if we already know this to avoid log spam
         existing = self.collection.get(ids=[doc_id])
         if existing['ids']:
-            print(f"[Memory] I already know: '{text}'")
+            logger.info("I already know: '%s'", text)
             return
 
-        print(f"[Memory] Storing new fact: '{text}'")
+        logger.info("Storing new fact: '%s'", text)
         self.collection.add(
             documents=[text],
             ids=[doc_id]
         )
 
     def recall(self, query):
-        print(f"[Memory] Searching for: '{query}'...")
+        logger.debug("Searching for: '%s'", query)
         results = self.collection.query(
             query_texts=[query],
             n_results=2 
@@ -0,0 +1,322 @@
+import re
+import time
+import random
+import threading
+from collections import deque
+from groq import APIStatusError, APIConnectionError, APITimeoutError
+from core.logger import get_logger
+
+logger = get_logger("scheduler")
+
+# Groq free tier defaults. TPM is corrected from response headers, RPM is not:
+# Groq's x-ratelimit-*-requests headers describe the daily quota, not the minute.
+DEFAULT_RPM = 30
+DEFAULT_TPM = 6000
+DEFAULT_RPD = 14400
+
+
+class SchedulerError(Exception):
+    pass
+
+class DeadlineExceeded(SchedulerError):
+    pass
+
+class TurnCancelled(SchedulerError):
+    pass
+
+
+def parse_reset(value):
+    """Turns Groq reset headers like '2m59.56s', '7.66s' or '120ms' into seconds."""
+    if not value:
+        return None
+    total = 0.0
+    found = False
+    for amount, unit in re.findall(r"(\d+(?:\.\d+)?)(ms|h|m|s)", str(value)):
+        found = True
+        amount = float(amount)
+        if unit == "ms": total += amount / 1000
+        elif unit == "h": total += amount * 3600
+        elif unit == "m": total += amount * 60
+        else: total += amount
+    if not found:
+        try: return float(value)
+        except ValueError: return None
+    return total
+
+
+def _header_number(headers, name):
+    try:
+        return float(headers.get(name))
+    except (TypeError, ValueError):
+        return None
+
+
+# --- TOKEN BUCKET ---
+class _Bucket:
+    def __init__(self, capacity, period=60.0):
+        self.period = period
+        self.capacity = float(capacity)
+        self.level = float(capacity)
+        self.rate = self.capacity / period
+        self.stamp = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self, now):
+        # Nothing refills while the server has us blocked
+        start = max(self.stamp, self.blocked_until)
+        if now > start:
+            self.level = min(self.capacity, self.level + (now - start) * self.rate)
+        self.stamp = max(now, self.stamp)
+
+    def wait_time(self, amount, now):
+        """Seconds until `amount` can be taken (0 if available right now)."""
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate if self.rate > 0 else self.period
+
+    def take(self, amount, now):
+        self._refill(now)
+        self.level -= min(amount, self.capacity)
+
+    def sync(self, limit, remaining, now):
+        """Overwrites our guess with what the server just reported. The refill rate stays capacity / period."""
+        if limit:
+            self.capacity = float(limit)
+            self.rate = self.capacity / self.period
+        if remaining is not None:
+            self.level = min(self.capacity, remaining)
+        self.stamp = now
+
+    def drain(self, reset, now):
+        """Server said 429: empty, and blocked for `reset` seconds. The refill rate is left alone."""
+        self._refill(now)
+        self.level = 0.0
+        if reset:
+            self.blocked_until = max(self.blocked_until, now + reset)
+
+
+# --- SCHEDULER ---
+class RateLimitScheduler:
+    """Queues Groq calls per model so we stay inside the per-minute budgets."""
+
+    def __init__(self, max_retries=4, base_delay=0.5, max_delay=20.0, default_deadline=30.0,
+                 rpm=DEFAULT_RPM, tpm=DEFAULT_TPM, rpd=DEFAULT_RPD):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.rpd = rpd
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.default_deadline = default_deadline
+
+        self.cond = threading.Condition()
+        self.requests = {}   # model -> _Bucket (requests per minute, never synced)
+        self.daily = {}      # model -> _Bucket (requests per day, synced from headers)
+        self.tokens = {}     # model -> _Bucket (tokens per minute, synced from headers)
+        self.queues = {}     # model -> deque of waiting tickets
+        self.turn = 0
+        self.in_flight = 0
+
+        self.stats = {
+            "acquired": 0,
+            "completed": 0,
+            "retries": 0,
+            "rate_limited": 0,
+            "cancelled": 0,
+            "deadline_exceeded": 0,
+            "last_wait": 0.0,
+            "max_wait": 0.0,
+            "total_wait": 0.0,
+        }
+
+    # --- TURNS ---
+    def new_turn(self):
+        """Starts a new live turn. Anything still queued for an older turn is dropped."""
+        with self.cond:
+            self.turn += 1
+            self.cond.notify_all()
+            return self.turn
+
+    def _is_stale(self, turn):
+        return turn is not None and turn < self.turn
+
+    # --- BUCKETS ---
+    def _buckets(self, model):
+        if model not in self.requests:
+            self.requests[model] = _Bucket(self.rpm)
+            self.daily[model] = _Bucket(self.rpd, period=86400.0)
+            self.tokens[model] = _Bucket(self.tpm)
+            self.queues[model] = deque()
+        return self.requests[model], self.tokens[model], self.queues[model]
+
+    def _sync_headers(self, model, headers):
+        if not headers:
+            return
+        now = time.monotonic()
+        _, tok_bucket, _ = self._buckets(model)
+        self.daily[model].sync(
+            _header_number(headers, "x-ratelimit-limit-requests"),
+            _header_number(headers, "x-ratelimit-remaining-requests"),
+            now,
+        )
+        tok_bucket.sync(
+            _header_number(headers, "x-ratelimit-limit-tokens"),
+            _header_number(headers, "x-ratelimit-remaining-tokens"),
+            now,
+        )
+
+    def _drain_exhausted(self, model, headers, retry_after):
+        """On a 429, empty the bucket(s) that actually ran out."""
+        now = time.monotonic()
+        req_bucket, tok_bucket, _ = self._buckets(model)
+        left_tokens = _header_number(headers, "x-ratelimit-remaining-tokens") if headers else None
+        left_today = _header_number(headers, "x-ratelimit-remaining-requests") if headers else None
+
+        if left_tokens == 0:
+            tok_bucket.drain(retry_after or parse_reset(headers.get("x-ratelimit-reset-tokens")), now)
+        if left_today == 0:
+            self.daily[model].drain(retry_after or parse_reset(headers.get("x-ratelimit-reset-requests")), now)
+        if left_tokens is None and left_today is None:
+            # No hint which limit it was, assume both per-minute budgets are spent
+            tok_bucket.drain(retry_after, now)
+            req_bucket.drain(retry_after, now)
+        elif left_tokens != 0 and left_today != 0:
+            # Neither reported quota is empty, so it was the per-minute request limit
+            req_bucket.drain(retry_after, now)
+
+    def _acquire(self, model, est_tokens, deadline, turn):
+        """Blocks until this caller is first in line and both buckets have room."""
+        ticket = object()
+        started = time.monotonic()
+        with self.cond:
+            req_bucket, tok_bucket, queue = self._buckets(model)
+            day_bucket = self.daily[model]
+            queue.append(ticket)
+            try:
+                while True:
+                    if self._is_stale(turn):
+                        self.stats["cancelled"] += 1
+                        raise TurnCancelled("A newer turn replaced this request")
+                    now = time.monotonic()
+                    if now >= deadline:
+                        self.stats["deadline_exceeded"] += 1
+                        raise DeadlineExceeded(f"Gave up waiting for {model} rate limit")
+
+                    wait = 0.1
+                    if queue[0] is ticket:
+                        wait = max(
+                            req_bucket.wait_time(1, now),
+                            day_bucket.wait_time(1, now),
+                            tok_bucket.wait_time(est_tokens, now),
+                        )
+                        if wait <= 0:
+                            req_bucket.take(1, now)
+                            day_bucket.take(1, now)
+                            tok_bucket.take(est_tokens, now)
+                            self.in_flight += 1
+                            break
+                    self.cond.wait(timeout=min(wait, deadline - now))
+            finally:
+                queue.remove(ticket)
+                self.cond.notify_all()
+
+            waited = time.monotonic() - started
+            self.stats["acquired"] += 1
+            self.stats["last_wait"] = waited
+            self.stats["max_wait"] = max(self.stats["max_wait"], waited)
+            self.stats["total_wait"] += waited
+
+    def _release(self):
+        with self.cond:
+            self.in_flight -= 1
+            self.cond.notify_all()
+
+    def _backoff(self, attempt, retry_after=None):
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        if retry_after:
+            delay = max(delay, retry_after)
+        return delay
+
+    def _sleep(self, delay, deadline, turn):
+        """Sleeps for a retry, waking early if the turn goes stale."""
+        end = min(time.monotonic() + delay, deadline)
+        with self.cond:
+            while True:
+                if self._is_stale(turn):
+                    self.stats["cancelled"] += 1
+                    raise TurnCancelled("A newer turn replaced this request")
+                remaining = end - time.monotonic()
+                if remaining <= 0:
+                    break
+                self.cond.wait(timeout=remaining)
+        if time.monotonic() >= deadline:
+            with self.cond:
+                self.stats["deadline_exceeded"] += 1
+            raise DeadlineExceeded("Deadline passed while backing off")
+
+    # --- PUBLIC ---
+    def submit(self, model, call, est_tokens=0, deadline=None, turn=None):
+        """
+        Runs `call(timeout)` once the model's budget allows it.
+        `call` must return a raw Groq response (`.headers` + `.parse()`).
+        """
+        if deadline is None:
+            deadline = self.default_deadline
+        deadline = time.monotonic() + deadline
+
+        attempt = 0
+        while True:
+            self._acquire(model, est_tokens, deadline, turn)
+            retry_after = None
+            try:
+                raw = call(max(1.0, deadline - time.monotonic()))
+                with self.cond:
+                    self._sync_headers(model, raw.headers)
+                    self.stats["completed"] += 1
+                return raw.parse()
+            except APIStatusError as e:
+                headers = e.response.headers if e.response is not None else None
+                with self.cond:
+                    self._sync_headers(model, headers)
+                    if e.status_code == 429:
+                        self.stats["rate_limited"] += 1
+                        retry_after = parse_reset(headers.get("retry-after")) if headers else None
+                        self._drain_exhausted(model, headers, retry_after)
+                if e.status_code != 429 and e.status_code < 500:
+                    raise
+                if attempt >= self.max_retries:
+                    raise
+            except (APITimeoutError, APIConnectionError):
+                if attempt >= self.max_retries:
+                    raise
+            finally:
+                self._release()
+
+            with self.cond:
+                self.stats["retries"] += 1
+            delay = self._backoff(attempt, retry_after)
+            logger.warning("%s request failed (attempt %d), retrying in %.1fs", model, attempt + 1, delay)
+            self._sleep(delay, deadline, turn)
+            attempt += 1
+
+    def metrics(self):
+        """Snapshot of queue depth and wait times for the UI."""
+        with self.cond:
+            snapshot = dict(self.stats)
+            snapshot["avg_wait"] = self.stats["total_wait"] / max(1, self.stats["acquired"])
+            snapshot["in_flight"] = self.in_flight
+            snapshot["queue_depth"] = sum(len(q) for q in self.queues.values())
+            snapshot["models"] = {
+                model: {
+                    "queued": len(self.queues[model]),
+                    "requests_left": int(self.requests[model].level),
+                    "requests_today_left": int(self.daily[model].level),
+                    "tokens_left": int(self.tokens[model].level),
+                }
+                for model in self.queues
+            }
+            return snapshot
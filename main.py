@@ -16,12 +16,15 @@ os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = "1"
 import pygame
 import edge_tts
 
+from core.logger import setup_logging, shutdown_logging, capture, get_logger
 from core.brain import MagicBrain
 from core.hands import vegaHands
 from RealtimeSTT import AudioToTextRecorder
 
 # --- CONFIG ---
 load_dotenv() 
+setup_logging()
+logger = get_logger("main")
 API_KEY = os.getenv("GROQ_API_KEY")
 
 SETTINGS = {
@@ -172,6 +175,10 @@ class AssistantGUI(ctk.CTk):
         self.cpu_label = ctk.CTkLabel(self.sidebar, text="SYSTEM: ONLINE")
         self.cpu_label.pack(side="bottom", pady=10)
 
+        # Groq queue metrics
+        self.queue_label = ctk.CTkLabel(self.sidebar, text="QUEUE: 0 | WAIT: 0.0s", font=("Arial", 11))
+        self.queue_label.pack(side="bottom", pady=(0, 5))
+
         # --- MAIN AREA ---
         self.main_area = ctk.CTkFrame(self, fg_color="transparent")
         self.main_area.grid(row=0, column=1, sticky="nsew", padx=20, pady=20)
@@ -193,9 +200,12 @@ class AssistantGUI(ctk.CTk):
         self.is_running = True
         self.is_sleeping = False 
         self.recorder = None
+        self.stt_hold = False
         
         threading.Thread(target=self.bg_listener, daemon=True).start()
         threading.Thread(target=self.init_tray_icon, daemon=True).start()
+        self.brain.fact_extractor.start()
+        self.update_metrics()
 
     # --- NEW SETTINGS LOGIC ---
     def save_settings(self):
@@ -249,6 +259,7 @@ class AssistantGUI(ctk.CTk):
     def graceful_shutdown(self):
         self.log("SYS", "SHUTDOWN SEQUENCE...")
         self.is_running = False
+        self.brain.fact_extractor.stop()
         if pygame.mixer.music.get_busy():
             try:
                 pygame.mixer.music.stop()
@@ -257,7 +268,8 @@ class AssistantGUI(ctk.CTk):
         if self.recorder:
             try: self.recorder.shutdown()
             except: pass
-        print(">>> GOODBYE.")
+        logger.info("GOODBYE.")
+        shutdown_logging()  # os._exit skips atexit, drain the log queue first
         self.quit()
         os._exit(0)
 
@@ -295,6 +307,17 @@ class AssistantGUI(ctk.CTk):
             self.chat_box.configure(state="disabled")
         except: pass
 
+    def update_metrics(self):
+        """Shows the Groq queue depth and wait time in the sidebar."""
+        m = self.brain.scheduler.metrics()
+        try:
+            self.queue_label.configure(
+                text=f"QUEUE: {m['queue_depth']} | WAIT: {m['last_wait']:.1f}s"
+            )
+        except: pass
+        if self.is_running:
+            self.after(1000, self.update_metrics)
+
     def set_status(self, text, state="IDLE"):
         try:
             self.status_bar.configure(text=f">> {text}")
@@ -302,6 +325,14 @@ class AssistantGUI(ctk.CTk):
         except: pass
 
     def process(self, text):
+        # The whole turn counts as live, so background memory work stays out of the way
+        self.brain.begin_live()
+        try:
+            self._process(text)
+        finally:
+            self.brain.end_live()
+
+    def _process(self, text):
         if not text: return
         clean_text = text.lower().replace(".", "").replace("!", "").replace("?", "").replace(",", "").strip()
 
@@ -366,6 +397,9 @@ class AssistantGUI(ctk.CTk):
 
         # --- 7. BRAIN ---
         response = self.brain.think(text, image_path=img_path)
+        if not response:
+            self.set_status("LISTENING...", "LISTENING")
+            return
 
         # TAGS
         if "[TYPE:" in response:
@@ -397,29 +431,40 @@ class AssistantGUI(ctk.CTk):
         self.speak(response)
 
     def speak(self, text):
-        self.set_status("SPEAKING...", "SPEAKING")
-        try: pygame.mixer.music.unload()
-        except: pass
-
+        # Held until playback ends (released in _monitor_playback)
+        self.brain.begin_live()
         try:
-            asyncio.run(self._gen_audio(text))
-        except PermissionError:
-            time.sleep(0.2)
+            self.set_status("SPEAKING...", "SPEAKING")
+            try: pygame.mixer.music.unload()
+            except: pass
+
             try:
-                if os.path.exists(OUTPUT_FILE): os.remove(OUTPUT_FILE)
                 asyncio.run(self._gen_audio(text))
-            except: return
+            except PermissionError:
+                time.sleep(0.2)
+                try:
+                    if os.path.exists(OUTPUT_FILE): os.remove(OUTPUT_FILE)
+                    asyncio.run(self._gen_audio(text))
+                except:
+                    self.brain.end_live()
+                    return
 
-        try:
-            pygame.mixer.music.load(OUTPUT_FILE)
-            pygame.mixer.music.play()
-            threading.Thread(target=self._monitor_playback, daemon=True).start()
-        except Exception as e:
-            self.log("SYS", f"Playback Error: {e}")
+            try:
+                pygame.mixer.music.load(OUTPUT_FILE)
+                pygame.mixer.music.play()
+                threading.Thread(target=self._monitor_playback, daemon=True).start()
+            except Exception as e:
+                self.brain.end_live()
+                self.log("SYS", f"Playback Error: {e}")
+        except BaseException:
+            # TTS failed (offline, no audio, empty text) before playback took over
+            self.brain.end_live()
+            raise
 
     def _monitor_playback(self):
         while pygame.mixer.music.get_busy() and self.is_running:
             time.sleep(0.1)
+        self.brain.end_live()
         
         if self.is_sleeping:
             self.set_status("SLEEPING (Say 'Hello Vega')", "SLEEP")
@@ -433,26 +478,46 @@ class AssistantGUI(ctk.CTk):
         communicate = edge_tts.Communicate(text, SETTINGS["voice"])
         await communicate.save(OUTPUT_FILE)
 
+    # --- LIVE TURN: from the moment the user starts talking ---
+    def on_recording_start(self):
+        if not self.stt_hold:
+            self.stt_hold = True
+            self.brain.begin_live()
+
+    def end_stt_hold(self):
+        if self.stt_hold:
+            self.stt_hold = False
+            self.brain.end_live()
+
     def bg_listener(self):
-        print(f">>> INITIALIZING EARS ({SETTINGS['stt_model']}) ON: {SETTINGS['device'].upper()}")
+        logger.info("INITIALIZING EARS (%s) ON: %s", SETTINGS['stt_model'], SETTINGS['device'].upper())
+        capture("realtimestt")
         try:
             self.recorder = AudioToTextRecorder(
                 spinner=False, 
                 model=SETTINGS['stt_model'], 
                 language="en",
                 device=SETTINGS['device'], 
-                compute_type="int8"
+                compute_type="int8",
+                no_log_file=True,  # goes through our rotating log instead of realtimesst.log
+                on_recording_start=self.on_recording_start
             )
         except Exception as e:
+            logger.exception("Mic Error")
             self.log("SYS", f"Mic Error: {e}")
             return
+        # The recorder adds its own stderr handler while starting up, take it back out
+        capture("realtimestt")
 
         self.set_status("ONLINE (LISTENING)", "LISTENING")
         while self.is_running:
             try:
-                text = self.recorder.text()
-                if text and len(text) > 1:
-                    self.process(text)
+                try:
+                    text = self.recorder.text()
+                    if text and len(text) > 1:
+                        self.process(text)
+                finally:
+                    self.end_stt_hold()
             except:
                 if not self.is_running: break
                 time.sleep(0.5)
@@ -0,0 +1,352 @@
+# -*- coding: utf-8 -*-
+"""
+VEGA memory tool: bulk import / export / compaction for vega_memory_db.
+
+    python memory_tool.py stats
+    python memory_tool.py export facts.jsonl [--embeddings]
+    python memory_tool.py import facts.jsonl
+    python memory_tool.py compact [--similarity 0.95] [--max-age-days 365] [--dry-run]
+
+Everything is streamed in batches, so memory stays flat even with 100k+ facts.
+Note: Chroma does not give disk space back when rows are deleted, so the
+reported disk size stays the same after compact (deleted slots get reused).
+JSONL lines look like {"id": ..., "document": ..., "metadata": {...}, "embedding": [...]};
+only "document" is required (a bare JSON string also works).
+"""
+import os
+import sys
+import time
+import json
+import random
+import hashlib
+import argparse
+import numpy as np
+import chromadb
+
+DB_PATH = "./vega_memory_db"
+COLLECTION = "user_facts"
+BATCH = 1000
+
+
+def open_collection(path):
+    client = chromadb.PersistentClient(path=path)
+    return client, client.get_or_create_collection(name=COLLECTION)
+
+
+def generate_id(text):
+    # Same stable ID as vegaMemory, so imports and live memories dedupe on text
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def batch_size(client, wanted):
+    return max(1, min(wanted, client.get_max_batch_size()))
+
+
+def iter_pages(collection, size, include):
+    """Yields collection.get() pages until the store runs out."""
+    offset = 0
+    while True:
+        page = collection.get(limit=size, offset=offset, include=include)
+        if not page["ids"]:
+            return
+        yield page
+        offset += len(page["ids"])
+
+
+# --- STATS ---
+def dir_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try: total += os.path.getsize(os.path.join(root, name))
+            except OSError: pass
+    return total
+
+
+def measure(path, collection, samples=20):
+    """Store size plus query latency, using stored embeddings as queries (no model needed)."""
+    count = collection.count()
+    report = {"facts": count, "disk_mb": dir_size(path) / (1024 * 1024), "query_ms_p50": None, "query_ms_p95": None}
+    if not count:
+        return report
+
+    offsets = sorted(random.sample(range(count), min(samples, count)))
+    timings = []
+    for offset in offsets:
+        probe = collection.get(limit=1, offset=offset, include=["embeddings"])
+        if not probe["ids"]:
+            continue
+        start = time.perf_counter()
+        collection.query(query_embeddings=[probe["embeddings"][0]], n_results=2, include=["documents"])
+        timings.append((time.perf_counter() - start) * 1000)
+    if timings:
+        timings.sort()
+        report["query_ms_p50"] = timings[len(timings) // 2]
+        report["query_ms_p95"] = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+    return report
+
+
+def print_report(title, report, out=None):
+    line = f"{title:<8} facts={report['facts']:<8} disk={report['disk_mb']:.1f}MB"
+    if report["query_ms_p50"] is not None:
+        line += f" query p50={report['query_ms_p50']:.1f}ms p95={report['query_ms_p95']:.1f}ms"
+    print(line, file=out or sys.stdout)
+
+
+# --- EXPORT ---
+def export_facts(client, collection, out_path, size, embeddings=False):
+    include = ["documents", "metadatas"] + (["embeddings"] if embeddings else [])
+    written = 0
+    out = sys.stdout if out_path == "-" else open(out_path, "w", encoding="utf-8")
+    try:
+        for page in iter_pages(collection, batch_size(client, size), include):
+            for i, doc_id in enumerate(page["ids"]):
+                row = {"id": doc_id, "document": page["documents"][i]}
+                if page["metadatas"] and page["metadatas"][i]:
+                    row["metadata"] = page["metadatas"][i]
+                if embeddings:
+                    row["embedding"] = [float(x) for x in page["embeddings"][i]]
+                out.write(json.dumps(row, ensure_ascii=False) + "\n")
+            written += len(page["ids"])
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return written
+
+
+# --- IMPORT ---
+def _flush_import(collection, rows):
+    now = time.time()
+    # Rows that bring their own embedding keep it, Chroma embeds the rest
+    with_vectors = [r for r in rows if r["embedding"] is not None]
+    without_vectors = [r for r in rows if r["embedding"] is None]
+    for group in (with_vectors, without_vectors):
+        if not group:
+            continue
+        kwargs = {
+            "ids": [r["id"] for r in group],
+            "documents": [r["document"] for r in group],
+            "metadatas": [r["metadata"] or {"source": "import", "created": now} for r in group],
+        }
+        if group is with_vectors:
+            kwargs["embeddings"] = [r["embedding"] for r in group]
+        collection.upsert(**kwargs)
+
+
+def import_facts(client, collection, in_path, size):
+    size = batch_size(client, size)
+    rows, seen, imported, skipped = [], set(), 0, 0
+    source = sys.stdin if in_path == "-" else open(in_path, "r", encoding="utf-8")
+    try:
+        for line_no, line in enumerate(source, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                item = json.loads(line)
+            except ValueError:
+                print(f"line {line_no}: not JSON, skipped", file=sys.stderr)
+                skipped += 1
+                continue
+            if isinstance(item, str):
+                item = {"document": item}
+            text = (item.get("document") or item.get("text")) if isinstance(item, dict) else None
+            if not isinstance(text, str):
+                print(f"line {line_no}: not a fact object, skipped", file=sys.stderr)
+                skipped += 1
+                continue
+            text = text.strip()
+            if not text:
+                skipped += 1
+                continue
+            doc_id = item.get("id") or generate_id(text)
+            # Upsert rejects duplicate IDs inside one call
+            if doc_id in seen:
+                skipped += 1
+                continue
+            seen.add(doc_id)
+            rows.append({
+                "id": doc_id,
+                "document": text,
+                "metadata": item.get("metadata"),
+                "embedding": item.get("embedding"),
+            })
+            if len(rows) >= size:
+                _flush_import(collection, rows)
+                imported += len(rows)
+                rows, seen = [], set()
+        if rows:
+            _flush_import(collection, rows)
+            imported += len(rows)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+    return imported, skipped
+
+
+# --- COMPACT ---
+def _is_expired(metadata, now, max_age):
+    if not metadata:
+        return False
+    expires = metadata.get("expires")
+    if isinstance(expires, (int, float)) and expires < now:
+        return True
+    created = metadata.get("created")
+    return bool(max_age and isinstance(created, (int, float)) and now - created > max_age)
+
+
+def _carry_created(updates, survivor_id, survivor_meta, merged_meta):
+    """The survivor of a merge keeps the oldest 'created' of the pair."""
+    merged = (merged_meta or {}).get("created")
+    if not isinstance(merged, (int, float)):
+        return
+    meta = updates.get(survivor_id) or dict(survivor_meta or {})
+    current = meta.get("created")
+    if not isinstance(current, (int, float)) or merged < current:
+        meta["created"] = merged
+        updates[survivor_id] = meta
+
+
+def compact(client, collection, size, similarity=0.95, max_age_days=None, neighbours=5, dry_run=False):
+    """
+    Drops expired facts, then walks the store page by page and merges each
+    fact's near-duplicates into it (the survivor keeps the oldest 'created').
+    Only IDs are held in memory across pages, never documents or embeddings.
+    """
+    size = batch_size(client, size)
+    now = time.time()
+    max_age = max_age_days * 86400 if max_age_days else None
+
+    # 1. Expired facts, plus the full ID list so deletes don't shift our paging
+    all_ids, expired = [], []
+    for page in iter_pages(collection, size, ["metadatas"]):
+        for doc_id, meta in zip(page["ids"], page["metadatas"]):
+            if _is_expired(meta, now, max_age):
+                expired.append(doc_id)
+            else:
+                all_ids.append(doc_id)
+
+    # 2. Near-duplicates (expired ones are already going, ignore them)
+    dropped, kept, updates = set(), set(), {}
+    gone = set(expired)
+    for start in range(0, len(all_ids), size):
+        chunk = [i for i in all_ids[start:start + size] if i not in dropped]
+        if not chunk:
+            continue
+        page = collection.get(ids=chunk, include=["embeddings", "metadatas"])
+        if not page["ids"]:
+            continue
+        raw = np.asarray(page["embeddings"], dtype=np.float32)
+        # Query with the stored vectors as-is (the index may be L2), compare by cosine
+        vectors = raw / (np.linalg.norm(raw, axis=1, keepdims=True) + 1e-9)
+        results = collection.query(
+            query_embeddings=raw.tolist(),
+            n_results=min(neighbours + 1, collection.count()),
+            include=["embeddings", "metadatas"],
+        )
+        for row, doc_id in enumerate(page["ids"]):
+            if doc_id in dropped:
+                continue
+            own_meta = page["metadatas"][row]
+
+            # First decide whether doc_id survives, only then drop anything
+            survivor, duplicates = None, []
+            for col, other_id in enumerate(results["ids"][row]):
+                if other_id == doc_id or other_id in dropped or other_id in gone:
+                    continue
+                other = np.asarray(results["embeddings"][row][col], dtype=np.float32)
+                other = other / (np.linalg.norm(other) + 1e-9)
+                if float(vectors[row] @ other) < similarity:
+                    continue
+                if other_id in kept:
+                    survivor = (other_id, results["metadatas"][row][col])
+                    break
+                duplicates.append((other_id, results["metadatas"][row][col]))
+
+            if survivor is not None:
+                # Merge into an earlier survivor; our other neighbours get their own turn
+                dropped.add(doc_id)
+                updates.pop(doc_id, None)
+                _carry_created(updates, survivor[0], survivor[1], own_meta)
+                continue
+
+            kept.add(doc_id)
+            for other_id, other_meta in duplicates:
+                dropped.add(other_id)
+                _carry_created(updates, doc_id, own_meta, other_meta)
+
+    if not dry_run:
+        for ids in (expired, list(dropped)):
+            for start in range(0, len(ids), size):
+                collection.delete(ids=ids[start:start + size])
+        update_ids = [i for i in updates if i not in dropped]
+        for start in range(0, len(update_ids), size):
+            batch = update_ids[start:start + size]
+            collection.update(ids=batch, metadatas=[updates[i] for i in batch])
+    return len(expired), len(dropped)
+
+
+# --- CLI ---
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk tools for VEGA's long-term memory")
+    parser.add_argument("--path", default=DB_PATH, help="Chroma directory (default: ./vega_memory_db)")
+    parser.add_argument("--batch", type=int, default=BATCH, help="Rows per Chroma call")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("stats", help="Show store size and query latency")
+
+    exp = sub.add_parser("export", help="Write all facts to JSONL ('-' for stdout)")
+    exp.add_argument("file")
+    exp.add_argument("--embeddings", action="store_true", help="Include embeddings")
+
+    imp = sub.add_parser("import", help="Upsert facts from JSONL ('-' for stdin)")
+    imp.add_argument("file")
+
+    comp = sub.add_parser("compact", help="Merge near-duplicates and drop expired facts")
+    comp.add_argument("--similarity", type=float, default=0.95, help="Cosine similarity to treat as duplicate")
+    comp.add_argument("--max-age-days", type=float, default=None, help="Also drop facts older than this")
+    comp.add_argument("--neighbours", type=int, default=5, help="Neighbours checked per fact")
+    comp.add_argument("--dry-run", action="store_true", help="Report only, change nothing")
+
+    args = parser.parse_args(argv)
+    client, collection = open_collection(args.path)
+
+    if args.command == "stats":
+        print_report("store", measure(args.path, collection))
+        return
+
+    before = measure(args.path, collection)
+    started = time.perf_counter()
+
+    if args.command == "export":
+        count = export_facts(client, collection, args.file, args.batch, args.embeddings)
+        print(f"exported {count} facts", file=sys.stderr)
+    elif args.command == "import":
+        imported, skipped = import_facts(client, collection, args.file, args.batch)
+        print(f"imported {imported} facts, skipped {skipped}")
+    elif args.command == "compact":
+        expired, merged = compact(
+            client, collection, args.batch,
+            similarity=args.similarity,
+            max_age_days=args.max_age_days,
+            neighbours=args.neighbours,
+            dry_run=args.dry_run,
+        )
+        verb = "would drop" if args.dry_run else "dropped"
+        print(f"{verb} {expired} expired and {merged} near-duplicate facts")
+        if expired or merged:
+            print("note: Chroma does not reclaim disk space on delete, the disk size will not go down")
+
+    elapsed = time.perf_counter() - started
+    if args.command == "export":
+        # stdout may be the export itself, keep the report on stderr
+        print(f"took {elapsed:.1f}s", file=sys.stderr)
+        print_report("store", before, out=sys.stderr)
+        return
+    print(f"took {elapsed:.1f}s")
+    print_report("before", before)
+    print_report("after", measure(args.path, collection))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+import time
+import threading
+import types
+import pytest
+
+pytest.importorskip("groq")
+
+from core.facts import FactExtractor
+from core.scheduler import RateLimitScheduler
+
+
+class FakeRaw:
+    headers = {}
+
+    def parse(self):
+        message = types.SimpleNamespace(content='Sure: ["The user likes tea."]')
+        return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)])
+
+
+def make_brain(history):
+    brain = types.SimpleNamespace()
+    brain.calls = 0
+    brain.stored = []
+
+    def create(**kwargs):
+        brain.calls += 1
+        return FakeRaw()
+
+    brain.idle = threading.Event()
+    brain.idle.set()
+    brain.scheduler = RateLimitScheduler()
+    brain.text_model = "fake-model"
+    brain.chat_history = history
+    brain.client = types.SimpleNamespace(chat=types.SimpleNamespace(completions=types.SimpleNamespace(
+        with_raw_response=types.SimpleNamespace(create=create))))
+    brain.estimate_tokens = lambda messages, max_tokens: 10
+    brain.long_term_memory = types.SimpleNamespace(
+        remember_many=lambda facts, similarity: brain.stored.append(facts))
+    return brain
+
+
+def history(turns):
+    messages = [{"role": "system", "content": "You are VEGA."}]
+    for i in range(turns):
+        messages.append({"role": "user", "content": f"question {i}"})
+        messages.append({"role": "assistant", "content": f"answer {i}"})
+    return messages
+
+
+def test_batches_one_call_per_batch(tmp_path):
+    brain = make_brain(history(8))
+    FactExtractor(brain, batch_size=3, seen_file=str(tmp_path / "seen.json")).run_once()
+    assert brain.calls == 3
+    assert len(brain.stored) == 3
+
+
+def test_restart_does_not_reprocess_saved_history(tmp_path):
+    seen_file = str(tmp_path / "seen.json")
+    saved = history(4)
+
+    first = make_brain(list(saved))
+    FactExtractor(first, seen_file=seen_file).run_once()
+    assert first.calls == 1
+
+    # Restart: same history reloaded from disk, plus one new turn
+    second = make_brain(list(saved) + [
+        {"role": "user", "content": "new question"},
+        {"role": "assistant", "content": "new answer"},
+    ])
+    extractor = FactExtractor(second, seen_file=seen_file)
+    assert len(extractor._pending_turns()) == 1
+    extractor.run_once()
+    assert second.calls == 1
+
+
+def test_waits_while_live_turn_runs(tmp_path):
+    brain = make_brain(history(2))
+    brain.idle.clear()
+    extractor = FactExtractor(brain, seen_file=str(tmp_path / "seen.json"))
+
+    thread = threading.Thread(target=extractor.run_once)
+    thread.start()
+    time.sleep(0.3)
+    assert brain.calls == 0
+    assert thread.is_alive()
+
+    # Live turn over: the pending batch goes out
+    brain.idle.set()
+    thread.join(timeout=3)
+    assert not thread.is_alive()
+    assert brain.calls == 1
+    assert not extractor._pending_turns()
+
+
+def test_new_turn_cancels_queued_extraction(tmp_path):
+    brain = make_brain(history(2))
+    brain.scheduler = RateLimitScheduler(rpm=1)
+    # Minute budget already spent, so the extraction has to queue
+    request_bucket, _, _ = brain.scheduler._buckets(brain.text_model)
+    request_bucket.take(1, time.monotonic())
+    extractor = FactExtractor(brain, seen_file=str(tmp_path / "seen.json"))
+
+    thread = threading.Thread(target=extractor.run_once)
+    thread.start()
+    for _ in range(50):
+        if brain.scheduler.metrics()["queue_depth"]:
+            break
+        time.sleep(0.05)
+    assert brain.scheduler.metrics()["queue_depth"] == 1
+
+    brain.scheduler.new_turn()
+    thread.join(timeout=3)
+    assert not thread.is_alive()
+    assert brain.calls == 0
+    assert brain.scheduler.metrics()["cancelled"] == 1
+    # Still pending, it will be picked up next round
+    assert len(extractor._pending_turns()) == 2
+
+
+def test_remember_many_dedupes_against_store_and_batch(tmp_path):
+    chromadb = pytest.importorskip("chromadb")
+    pytest.importorskip("duckduckgo_search")
+    from core.brain import vegaMemory
+
+    vectors = {
+        "The user likes tea.": [1.0, 0.0, 0.0],
+        "The user loves tea.": [0.99, 0.05, 0.0],
+        "The user has a dog.": [0.0, 1.0, 0.0],
+        "The user owns a dog.": [0.0, 0.99, 0.05],
+        "The user lives in Oslo.": [0.0, 0.0, 1.0],
+    }
+    memory = vegaMemory.__new__(vegaMemory)
+    memory.client = chromadb.PersistentClient(path=str(tmp_path / "db"))
+    memory.collection = memory.client.get_or_create_collection(name="user_facts")
+    memory.embedder = lambda texts: [vectors[t] for t in texts]
+    memory.collection.add(
+        ids=[memory._generate_id("The user likes tea.")],
+        documents=["The user likes tea."],
+        embeddings=[vectors["The user likes tea."]],
+    )
+
+    stored = memory.remember_many([
+        "The user loves tea.",
+        "The user has a dog.",
+        "The user owns a dog.",
+        "The user lives in Oslo.",
+        "The user lives in Oslo.",
+    ])
+
+    assert stored == ["The user has a dog.", "The user lives in Oslo."]
+    assert memory.collection.count() == 3
+    metadatas = memory.collection.get(ids=[memory._generate_id(f) for f in stored], include=["metadatas"])["metadatas"]
+    assert all(m["source"] == "auto" for m in metadatas)
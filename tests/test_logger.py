@@ -0,0 +1,76 @@
+import logging
+
+import core.logger
+from core.logger import CollapsingHandler, capture
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+def error_record(msg="Error initializing model", exc="RuntimeError: cublas64_12.dll not found"):
+    record = logging.makeLogRecord({"name": "realtimestt", "levelno": logging.ERROR, "levelname": "ERROR", "msg": msg})
+    record.exc_text = "Traceback (most recent call last):\n" + exc
+    return record
+
+
+def info_record(msg):
+    return logging.makeLogRecord({"name": "realtimestt", "levelno": logging.INFO, "levelname": "INFO", "msg": msg})
+
+
+def test_back_to_back_repeats_collapse():
+    out = ListHandler()
+    handler = CollapsingHandler([out])
+    for _ in range(5):
+        handler.handle(info_record("Receive from pipe"))
+    handler.handle(info_record("done"))
+
+    assert [r.getMessage() for r in out.records] == [
+        "Receive from pipe", "last message repeated 4 times", "done"
+    ]
+
+
+def test_traceback_seen_in_earlier_run_is_only_counted(tmp_path):
+    seen = str(tmp_path / "seen_errors.json")
+
+    first = ListHandler()
+    CollapsingHandler([first], seen).handle(error_record())
+    assert first.records[0].exc_text
+
+    # New process: same startup error, with other lines in between
+    second = ListHandler()
+    handler = CollapsingHandler([second], seen)
+    handler.handle(info_record("Starting RealTimeSTT"))
+    handler.handle(error_record())
+
+    assert second.records[-1].exc_text is None
+    assert second.records[-1].repeat == 2
+
+
+def test_seen_errors_are_bounded(tmp_path):
+    seen = str(tmp_path / "seen_errors.json")
+    handler = CollapsingHandler([ListHandler()], seen, max_seen=3)
+    for i in range(5):
+        handler.handle(error_record(exc=f"ValueError: {i}"))
+    assert len(handler.seen_errors) == 3
+    assert len(CollapsingHandler([ListHandler()], seen).seen_errors) == 3
+
+
+def test_capture_strips_handlers_added_by_the_library(monkeypatch):
+    ours = ListHandler()
+    monkeypatch.setattr(core.logger, "_queue_handler", ours)
+    target = logging.getLogger("test.capture")
+    capture("test.capture")
+
+    # Library init adds its own stderr handler after we captured it
+    target.addHandler(logging.StreamHandler())
+    capture("test.capture")
+
+    assert target.handlers == [ours]
+    assert target.propagate is False
+    target.removeHandler(ours)
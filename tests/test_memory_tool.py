@@ -0,0 +1,109 @@
+import math
+import pytest
+
+chromadb = pytest.importorskip("chromadb")
+np = pytest.importorskip("numpy")
+
+import memory_tool
+
+
+def unit(*values):
+    vec = np.asarray(values, dtype=np.float64)
+    return (vec / np.linalg.norm(vec)).tolist()
+
+
+def angle(degrees):
+    rad = math.radians(degrees)
+    return unit(math.cos(rad), math.sin(rad), 0.0)
+
+
+@pytest.fixture
+def store(tmp_path):
+    client, collection = memory_tool.open_collection(str(tmp_path / "db"))
+    return client, collection
+
+
+def add(collection, doc_id, vector, created):
+    collection.add(ids=[doc_id], documents=[doc_id], embeddings=[vector], metadatas=[{"created": created}])
+
+
+def test_compact_keeps_neighbour_with_no_surviving_duplicate(store):
+    """
+    B's neighbours are C then X. Both are similar to B, C is not similar to X,
+    and X is already a survivor. B merges into X; C must stay.
+    """
+    client, collection = store
+    x = angle(-17)
+    # Two near-copies of X, slightly further from B than X is, so X's own
+    # neighbour list fills up with them and never reaches B
+    add(collection, "X", x, created=300.0)
+    add(collection, "D1", unit(x[0], x[1], 0.01), created=400.0)
+    add(collection, "D2", unit(x[0], x[1], -0.01), created=400.0)
+    add(collection, "B", angle(0), created=100.0)
+    add(collection, "C", angle(15), created=200.0)
+
+    expired, merged = memory_tool.compact(client, collection, size=1, similarity=0.95, neighbours=2)
+
+    assert expired == 0
+    left = collection.get(include=["metadatas"])
+    assert sorted(left["ids"]) == ["C", "X"]
+    assert merged == 3
+    # X absorbed B, so it keeps B's older timestamp
+    created = dict(zip(left["ids"], (m["created"] for m in left["metadatas"])))
+    assert created["X"] == 100.0
+    assert created["C"] == 200.0
+
+
+def test_compact_drops_expired_and_merges_duplicates(store):
+    client, collection = store
+    add(collection, "A", angle(0), created=500.0)
+    add(collection, "A2", unit(1.0, 0.001, 0.0), created=50.0)
+    add(collection, "Far", angle(90), created=500.0)
+    collection.add(ids=["Old"], documents=["Old"], embeddings=[angle(45)], metadatas=[{"expires": 1.0}])
+
+    expired, merged = memory_tool.compact(client, collection, size=10)
+
+    assert (expired, merged) == (1, 1)
+    left = collection.get(include=["metadatas"])
+    assert sorted(left["ids"]) == ["A", "Far"]
+    assert dict(zip(left["ids"], left["metadatas"]))["A"]["created"] == 50.0
+
+
+def test_dry_run_changes_nothing(store):
+    client, collection = store
+    add(collection, "A", angle(0), created=1.0)
+    add(collection, "A2", unit(1.0, 0.001, 0.0), created=2.0)
+    assert memory_tool.compact(client, collection, size=10, dry_run=True) == (0, 1)
+    assert collection.count() == 2
+
+
+def test_import_skips_lines_that_are_not_facts(store, tmp_path):
+    client, collection = store
+    source = tmp_path / "facts.jsonl"
+    source.write_text("\n".join([
+        '[1, 2]',
+        '{"document": 42}',
+        'not json',
+        '{"id": "A", "document": "The user likes tea.", "embedding": %s}' % angle(0),
+    ]) + "\n", encoding="utf-8")
+
+    assert memory_tool.import_facts(client, collection, str(source), 10) == (1, 3)
+    assert collection.get()["ids"] == ["A"]
+
+
+def test_import_keeps_embeddings_when_some_rows_have_none(tmp_path):
+    calls = []
+
+    class Recorder:
+        def upsert(self, **kwargs):
+            calls.append(kwargs)
+
+    rows = [
+        {"id": "A", "document": "a", "metadata": None, "embedding": angle(0)},
+        {"id": "B", "document": "b", "metadata": None, "embedding": None},
+    ]
+    memory_tool._flush_import(Recorder(), rows)
+
+    assert [c["ids"] for c in calls] == [["A"], ["B"]]
+    assert calls[0]["embeddings"] == [angle(0)]
+    assert "embeddings" not in calls[1]
@@ -0,0 +1,118 @@
+import time
+import threading
+import pytest
+
+groq = pytest.importorskip("groq")
+
+from core.scheduler import RateLimitScheduler, DeadlineExceeded, TurnCancelled
+from fake_groq import FakeGroqServer, rate_limit_headers
+
+MODEL = "fake-model"
+
+
+def make_call(server):
+    client = groq.Groq(api_key="test", base_url=server.url, max_retries=0)
+    return lambda timeout: client.chat.completions.with_raw_response.create(
+        model=MODEL,
+        messages=[{"role": "user", "content": "hi"}],
+        timeout=timeout
+    )
+
+
+def test_backs_off_on_429_then_succeeds():
+    limited = (429, {"retry-after": "0.2"})
+    with FakeGroqServer([limited, limited, (200, rate_limit_headers())]) as server:
+        scheduler = RateLimitScheduler(base_delay=0.01, rpm=600)
+        started = time.monotonic()
+        completion = scheduler.submit(MODEL, make_call(server), est_tokens=10)
+        elapsed = time.monotonic() - started
+
+    assert completion.choices[0].message.content == "ok"
+    assert server.hits == 3
+    assert elapsed >= 0.4
+    stats = scheduler.metrics()
+    assert stats["rate_limited"] == 2
+    assert stats["retries"] == 2
+    assert stats["completed"] == 1
+
+
+def test_gives_up_at_deadline():
+    with FakeGroqServer([(429, {"retry-after": "5"})]) as server:
+        scheduler = RateLimitScheduler()
+        started = time.monotonic()
+        with pytest.raises(DeadlineExceeded):
+            scheduler.submit(MODEL, make_call(server), est_tokens=10, deadline=0.5)
+        assert time.monotonic() - started < 2
+    assert scheduler.metrics()["deadline_exceeded"] == 1
+
+
+def test_new_turn_cancels_stale_request():
+    with FakeGroqServer([(429, {"retry-after": "5"})]) as server:
+        scheduler = RateLimitScheduler()
+        turn = scheduler.new_turn()
+        errors = []
+
+        def worker():
+            try:
+                scheduler.submit(MODEL, make_call(server), est_tokens=10, turn=turn)
+            except TurnCancelled as e:
+                errors.append(e)
+
+        thread = threading.Thread(target=worker)
+        thread.start()
+        time.sleep(0.3)
+        scheduler.new_turn()
+        thread.join(timeout=2)
+
+    assert not thread.is_alive()
+    assert len(errors) == 1
+    assert scheduler.metrics()["cancelled"] == 1
+
+
+def test_queue_depth_while_waiting_for_tokens():
+    headers = rate_limit_headers(remaining_tokens=0, reset_tokens="1s")
+    with FakeGroqServer([(200, headers), (200, rate_limit_headers())]) as server:
+        scheduler = RateLimitScheduler()
+        call = make_call(server)
+        scheduler.submit(MODEL, call, est_tokens=10)
+
+        thread = threading.Thread(target=scheduler.submit, args=(MODEL, call), kwargs={"est_tokens": 100})
+        thread.start()
+        time.sleep(0.2)
+        assert scheduler.metrics()["queue_depth"] == 1
+        thread.join(timeout=3)
+
+    assert scheduler.metrics()["queue_depth"] == 0
+    assert scheduler.metrics()["last_wait"] > 0
+
+
+def test_daily_request_headers_do_not_lift_minute_limit():
+    with FakeGroqServer([(200, rate_limit_headers())]) as server:
+        scheduler = RateLimitScheduler(rpm=2)
+        call = make_call(server)
+        scheduler.submit(MODEL, call)
+        scheduler.submit(MODEL, call)
+        with pytest.raises(DeadlineExceeded):
+            scheduler.submit(MODEL, call, deadline=0.3)
+    assert scheduler.requests[MODEL].capacity == 2
+    assert scheduler.daily[MODEL].capacity == 14400
+
+
+def test_request_429_drains_request_bucket_not_tokens():
+    headers = dict(rate_limit_headers(remaining_tokens=5000), **{"retry-after": "0.2"})
+    with FakeGroqServer([(429, headers), (200, rate_limit_headers())]) as server:
+        scheduler = RateLimitScheduler(base_delay=0.01, rpm=600)
+        scheduler.submit(MODEL, make_call(server), est_tokens=10)
+    assert scheduler.metrics()["rate_limited"] == 1
+    assert scheduler.tokens[MODEL].level > 4000
+
+
+def test_short_retry_after_does_not_lift_minute_limit():
+    headers = dict(rate_limit_headers(), **{"retry-after": "0.2"})
+    with FakeGroqServer([(429, headers), (200, rate_limit_headers())]) as server:
+        scheduler = RateLimitScheduler(base_delay=0.01, rpm=2)
+        # After the 0.2s block the bucket refills at 2/min again, so the retry is 30s away
+        with pytest.raises(DeadlineExceeded):
+            scheduler.submit(MODEL, make_call(server), deadline=1)
+    assert server.hits == 1
+    assert scheduler.requests[MODEL].rate == pytest.approx(2 / 60)